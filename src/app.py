@@ -5,19 +5,28 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-import os
+from fastapi.responses import RedirectResponse, Response
+import hashlib
+from functools import lru_cache
+import gzip
+import orjson
+import threading
 from pathlib import Path
+from pydantic import BaseModel
+from types import MappingProxyType
+from typing import Literal
 
 app = FastAPI(title="Mergington High School API",
               description="API for viewing and signing up for extracurricular activities")
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=1)
 
 # Mount the static files directory
 current_dir = Path(__file__).parent
-app.mount("/static", StaticFiles(directory=os.path.join(Path(__file__).parent,
-          "static")), name="static")
+static_dir = current_dir / "static"
+app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # In-memory activity database
 activities = {
@@ -41,27 +50,181 @@ activities = {
     }
 }
 
+# Participant lists live in their own store, split off from the static
+# activity fields, so signups and unregistrations only ever touch this dict
+_participants = {name: activity.pop("participants")
+                 for name, activity in activities.items()}
 
-@app.get("/")
-def root():
-    return RedirectResponse(url="/static/index.html")
+# What remains is static metadata; freeze it so it can be read from anywhere
+# without locking or defensive copies
+activities = MappingProxyType({name: MappingProxyType(activity)
+                               for name, activity in activities.items()})
 
+# Position of each participant email in its activity's list, so membership
+# checks and removals are O(1) instead of a linear scan
+_participant_index = {name: {email: i for i, email in enumerate(emails)}
+                      for name, emails in _participants.items()}
 
-@app.get("/activities")
-def get_activities():
-    return activities
+# One lock per activity guarding the check-then-mutate of its participants
+_locks = {name: threading.Lock() for name in activities}
+
+# Bumped on every change to the participants; the serialized /activities
+# response is cached per version
+_version = 0
+
+
+@lru_cache(maxsize=1)
+def _static_fragments() -> tuple[tuple[bytes, list[str]], ...]:
+    """Pre-serialized JSON for the fields of each activity that never change,
+    ending right where its participants list starts, paired with that list"""
+    fragments = []
+    for name, activity in activities.items():
+        prefix = orjson.dumps(dict(activity))[:-1] + (b"," if activity else b"")
+        # The participant lists are only ever mutated in place, so holding
+        # on to them here stays valid for the life of the process
+        fragments.append((orjson.dumps(name) + b":" + prefix + b'"participants":',
+                          _participants[name]))
+    return tuple(fragments)
+
+
+@lru_cache(maxsize=1)
+def _serialized(version: int) -> tuple[bytes, bytes, str]:
+    """The /activities body, its gzipped form and its ETag at a given version"""
+    # Only the participant lists need serializing; everything else comes
+    # from the pre-serialized static fragments
+    body = b"{" + b",".join(
+        prefix + orjson.dumps(participants) + b"}"
+        for prefix, participants in _static_fragments()
+    ) + b"}"
+    # Weak, since the same ETag covers both the plain and gzipped bodies
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return body, gzip.compress(body, compresslevel=1, mtime=0), etag
+
+
+def _bump_version():
+    global _version
+    _version += 1
+
+
+# The redirect never changes, so build it once and hand out the same response.
+# It is permanent and cacheable so browsers stop re-requesting /
+_root_redirect = RedirectResponse(url="/static/index.html", status_code=308,
+                                  headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/", include_in_schema=False)
+async def root():
+    return _root_redirect
+
+
+class Activity(BaseModel):
+    description: str
+    schedule: str
+    max_participants: int
+    participants: list[str]
+
+
+# The model only documents the response; the cached bytes are returned as-is,
+# skipping validation and jsonable_encoder
+@app.get("/activities", responses={200: {"model": dict[str, Activity]}})
+async def get_activities(request: Request):
+    body, gzipped, etag = _serialized(_version)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304,
+                        headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+    # Serve the pre-compressed body; GZipMiddleware passes responses that
+    # already carry a Content-Encoding through untouched
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(content=gzipped, media_type="application/json",
+                        headers={"ETag": etag, "Vary": "Accept-Encoding",
+                                 "Content-Encoding": "gzip"})
+
+    # GZipMiddleware adds Vary itself to uncompressed responses it inspects
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag})
+
+
+def _signup(activity_name: str, email: str) -> tuple[int, str]:
+    """Add a student to an activity, returning (status_code, detail)"""
+    # Get the activity's participants, validating it exists in the same lookup
+    participants = _participants.get(activity_name)
+    if participants is None:
+        return 404, "Activity not found"
+
+    index = _participant_index[activity_name]
+    with _locks[activity_name]:
+        # Validate student is not already signed up
+        if email in index:
+            return 400, "Student is already signed up"
+
+        # Add student
+        index[email] = len(participants)
+        participants.append(email)
+    return 200, f"Signed up {email} for {activity_name}"
+
+
+def _unregister(activity_name: str, email: str) -> tuple[int, str]:
+    """Remove a student from an activity, returning (status_code, detail)"""
+    # Get the activity's participants, validating it exists in the same lookup
+    participants = _participants.get(activity_name)
+    if participants is None:
+        return 404, "Activity not found"
+
+    index = _participant_index[activity_name]
+    with _locks[activity_name]:
+        # Validate student is signed up
+        position = index.pop(email, None)
+        if position is None:
+            return 400, "Student is not signed up for this activity"
+
+        # Remove student. Participant order carries no meaning, so move the
+        # last participant into the freed slot rather than shifting the list
+        last = participants.pop()
+        if position < len(participants):
+            participants[position] = last
+            index[last] = position
+    return 200, f"Unregistered {email} from {activity_name}"
 
 
 @app.post("/activities/{activity_name}/signup")
-def signup_for_activity(activity_name: str, email: str):
+async def signup_for_activity(activity_name: str, email: str):
     """Sign up a student for an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
+    status_code, detail = _signup(activity_name, email)
+    if status_code != 200:
+        raise HTTPException(status_code=status_code, detail=detail)
+    _bump_version()
+    return Response(orjson.dumps({"message": detail}), media_type="application/json")
+
+
+@app.delete("/activities/{activity_name}/unregister")
+async def unregister_from_activity(activity_name: str, email: str):
+    """Unregister a student from an activity"""
+    status_code, detail = _unregister(activity_name, email)
+    if status_code != 200:
+        raise HTTPException(status_code=status_code, detail=detail)
+    _bump_version()
+    return Response(orjson.dumps({"message": detail}), media_type="application/json")
+
+
+class BatchOp(BaseModel):
+    op: Literal["signup", "unregister"]
+    activity: str
+    email: str
+
 
-    # Get the specific activity
-    activity = activities[activity_name]
+@app.post("/activities/batch", status_code=207)
+async def batch_update(ops: list[BatchOp]):
+    """Apply several signups/unregistrations in one request"""
+    handlers = {"signup": _signup, "unregister": _unregister}
+    results = []
+    changed = False
+    for index, item in enumerate(ops):
+        status_code, detail = handlers[item.op](item.activity, item.email)
+        changed = changed or status_code == 200
+        results.append({"index": index, "status": status_code, "detail": detail})
 
-    # Add student
-    activity["participants"].append(email)
-    return {"message": f"Signed up {email} for {activity_name}"}
+    # Invalidate the cached response once for the whole batch
+    if changed:
+        _bump_version()
+    return results